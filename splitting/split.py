@@ -1,8 +1,10 @@
 import argparse
 import os.path
+import re
 import shutil
 import zipfile
-from glob import glob
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import numpy as np
 import pandas as pd
@@ -14,213 +16,312 @@ FULL_NAME_COL = "full_name"
 MOODLE_ID_COL = "moodle_id"
 SUBMISSION_COL = "submission_file"
 
+# Compiled once at module scope, so get_submissions_df does not pay any regex compilation cost per submission.
+FULL_NAME_REGEX = re.compile(r".+(?=_\d{7})")
+MOODLE_ID_REGEX = re.compile(r"\d{7}")
+
+
 # TODO: encoding for every read and write access
 
-parser = argparse.ArgumentParser(description="Script to split all Moodle submissions into batches that will be "
-                                             "assigned to a given list of tutors, according to their employment hours.")
-parser.add_argument("-sf", "--submissions_file", type=str, required=True,
-                    help="Moodle ZIP file containing all submissions.")
-parser.add_argument("-n", "--number", type=int,
-                    help="Exercise number. If not specified, the Moodle ZIP filename is parsed to search for "
-                         "various names (see '--exercise_names') and a following number (separated by arbitrary "
-                         "whitespace characters, dashes or underscores). The number is used to roll the tutors, "
-                         "i.e., to shift them across the created submission splits (e.g., if the tutors are "
-                         "['A', 'B', 'C'] and the number is 1, then they are shifted by one, which results in "
-                         "['C', 'A', 'B']). Use the value 0 if no such shift should be applied.")
-parser.add_argument("--exercise_names", type=str, nargs="+",
-                    default=["Assignment", "Exercise", "UE", "Übung", "Aufgabe"],
-                    help="List of case-sensitive exercise names which will be used to automatically infer the "
-                         "exercise number from the Moodle ZIP filename. The number is assumed to follow one "
-                         "of these names, separated by arbitrary whitespace characters, dashes or underscores. "
-                         "Default: ['Assignment', 'Exercise', 'UE', 'Übung', 'Aufgabe']")
-tutors_group = parser.add_mutually_exclusive_group(required=True)
-tutors_group.add_argument("-tf", "--tutors_file", type=str,
-                          help="File containing tutor names (one name per line, no header). Optionally, a second "
-                               "column (separated via a comma) can be provided that contains weights per tutor that "
-                               "specify how the submission split sizes should be distributed. If no weights are "
-                               "specified, then an equal split size distribution is assumed.")
-tutors_group.add_argument("-tl", "--tutors_list", type=str, nargs="+",
-                          help="List of tutor names. Optionally, a second entry (separated via a comma) can be "
-                               "provided that contains weights per tutor that specify how the submission split sizes "
-                               "should be distributed. If no weights are specified, then an equal split size "
-                               "distribution is assumed.")
-parser.add_argument("--print_abs_paths", action="store_true",
-                    help="If specified, the printed output will show the absolute paths of all files. Otherwise, only "
-                         "the base filenames will be printed (default).")
-parser.add_argument("--create_overview_file", action="store_true",
-                    help="If specified, an overview CSV file will be created that contains all information on the "
-                         "individual submissions and how they were distributed to the different tutors. This is useful "
-                         "to quickly check which tutor corrected which submission. The name of the overview file will "
-                         "be the same as '--submissions_file' but with the extension replaced with '.csv'. If "
-                         "'--info_file' was also specified, then all the information within this info file is also "
-                         "added to the overview CSV file.")
-parser.add_argument("--sorting_keys", type=str, nargs="+", default=[],
-                    help="If specified, the submissions will be sorted according to these keys. The keys must be part "
-                         "of the header entries in the '--info_file', so this argument must be specified in addition. "
-                         "By default, the submissions will simply be sorted according to their names.")
-parser.add_argument("--submission_renaming_keys", type=str, nargs="+", default=[],
-                    help="If specified, the submissions will be renamed according to these keys. The renaming will be "
-                         "as follows: <key_1><sep><key_2>...<sep><key_n>, where <key_i> is the i-th key of these "
-                         "specified renaming keys and <sep> is the separator as defined by argument "
-                         "'--submission_renaming_separator'. The keys must be part of the header entries in the "
-                         "'--info_file', so this argument must be specified in addition. Note that these keys "
-                         "should lead to unique values for each submission, since otherwise, duplicate submission "
-                         "names would be created, which leads to overwriting and hence loss of data. By default, the "
-                         "original submission names will be used.")
-parser.add_argument("--submission_renaming_separator", type=str, default="_",
-                    help="The separator to use when renaming submissions (see '--submission_renaming_keys'). Has no "
-                         "effect in case '--submission_renaming_keys' is not set. Default: '_'")
-parser.add_argument("--info_file", type=str,
-                    help="If specified, this must be a CSV file containing student (meta-)data that can be used for "
-                         "sorting and renaming submissions. The CSV file must include a header, and these exact header "
-                         "entries can be used as sort/renaming keys as defined by arguments '--sorting_keys' and "
-                         "'--submission_renaming_keys', respectively. Typically, this is the course participants file "
-                         "that can be downloaded in the participants overview in Moodle. Important: Please ensure that "
-                         "this file is consistent with the '--submissions_file' in the sense that they contain the "
-                         "same metadata. For instance, name changes might occur during a semester. When downloading "
-                         "this info file only once at the start of the semester, such changes are not reflected, and "
-                         "it would then be inconsistent to the up-to-day '--submissions_file', which leads to errors.")
-parser.add_argument("--info_file_first_name_key", type=str,
-                    help="Only relevant if '--sorting_keys' is specified. If so, this argument indicates the header "
-                         "entry in the '--info_file' which contains the first name. Must be specified together with "
-                         "argument '--info_file_last_name_key'. If not specified, then the first name header entry is "
-                         "tried to be identified automatically based on string matching.")
-parser.add_argument("--info_file_last_name_key", type=str,
-                    help="Only relevant if '--sorting_keys' is specified. If so, this argument indicates the header "
-                         "entry in the '--info_file' which contains the last name. Must be specified together with "
-                         "argument '--info_file_first_name_key'. If not specified, then the last name header entry is "
-                         "tried to be identified automatically based on string matching.")
-args = parser.parse_args()
-
-if args.sorting_keys and args.info_file is None:
-    raise ValueError("must also specify '--info_file' when specifying '--sorting_keys'")
-if args.submission_renaming_keys and args.info_file is None:
-    raise ValueError("must also specify '--info_file' when specifying '--submission_renaming_keys'")
-if args.sorting_keys and bool(args.info_file_first_name_key) != bool(args.info_file_last_name_key):
-    raise ValueError("must specify either both or none of '--info_file_first_name_key' and 'info_file_last_name_key'")
-if args.info_file:
-    # Read as string data type to avoid inconsistent states for IDs (most notably, matriculation IDs with leading zeros,
-    # where the zeros would be dropped here if the IDs were interpreted as integers)
-    info_df = pd.read_csv(args.info_file, dtype=str)
-    
-    
-    def check_keys(keys, arg_name):
-        for k in keys:
-            if k not in info_df.columns:
-                raise ValueError(f"'--{arg_name}' contains '{k}' which is not part of the header entries in "
-                                 f"'--info_file': {info_df.columns.to_list()}")
-    
-    
-    if args.sorting_keys:
-        check_keys(args.sorting_keys, "sorting_keys")
-        if args.info_file_first_name_key:
-            check_keys([args.info_file_first_name_key], "info_file_first_name_key")
-        if args.info_file_last_name_key:
-            check_keys([args.info_file_last_name_key], "info_file_last_name_key")
+
+# Copy buffer size for streaming ZIP entries from the Moodle archive into the tutor ZIP files. The 1 MiB buffer
+# (instead of the 16 KiB zipfile default) considerably reduces the number of read/write calls for larger submission
+# files.
+ZIP_COPY_BUFFER_SIZE = 1 << 20
+
+
+def build_tutor_zip(chunk_file: str, submissions_file: str, entries: list[tuple], renaming_separator: str,
+                    zip_level: int):
+    # Stream all files of all submission directories of this chunk directly from the Moodle ZIP file into the tutors
+    # ZIP file, i.e., without the detour of extracting them to disk first. This function runs in a worker process (one
+    # per tutor ZIP, each with its own archive handle, since zipfile.ZipFile is not thread/process-safe), so "entries"
+    # is a list of plain tuples (submission followed by the renaming values, if any) rather than a DataFrame to keep
+    # the pickling overhead per task low.
+    # By default (zip_level == 0), the tutor ZIP files store the entries without compression: the submissions
+    # typically consist of already-compressed formats (ZIP, PDF, DOCX, images, ...), so running DEFLATE again would
+    # waste CPU time for practically no size reduction. Each entry is then decompressed exactly once (streamed from
+    # the source archive) and only copied. Positive levels enable DEFLATE compression at that level (see the
+    # '--zip_level' argument).
+    compression = zipfile.ZIP_STORED if zip_level == 0 else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(submissions_file, "r") as src, \
+            zipfile.ZipFile(chunk_file, "w", compression=compression, compresslevel=zip_level or None,
+                            allowZip64=True) as dst:
+        # Group the source entries by their top-level submission directory once, so the loop below can directly look
+        # up all files of a submission (ZIP entry names always use "/" as separator, independent of the platform).
+        submission_infos = defaultdict(list)
+        for info in src.infolist():
+            if not info.is_dir():
+                submission_infos[info.filename.split("/", 1)[0]].append(info)
+        # Hoist the attribute lookups of the innermost loop into locals once, so CPython only performs fast local
+        # loads per file instead of repeated module/instance attribute resolution.
+        src_open = src.open
+        dst_open = dst.open
+        copyfileobj = shutil.copyfileobj
+        zip_info = zipfile.ZipInfo
+        for submission, *renaming_values in entries:
+            # The renamed directory prefix is constant per submission, so build it once here instead of once per file.
+            renamed_prefix = renaming_separator.join(renaming_values) if renaming_values else None
+            for info in submission_infos[submission]:
+                if renamed_prefix is not None:
+                    name = f"{renamed_prefix}/{info.filename.rpartition('/')[2]}"
+                else:
+                    name = info.filename
+                # Carry over the entry metadata from the source archive, so file timestamps and permissions survive
+                # the repackaging.
+                dst_info = zip_info(name, date_time=info.date_time)
+                dst_info.external_attr = info.external_attr
+                # When ZipFile.open is given a ZipInfo instead of a name, it uses the entry's own compression settings
+                # and ignores the ones passed to the ZipFile constructor, so they must be set here explicitly (a new
+                # ZipInfo always defaults to ZIP_STORED). ZipInfo offers no public attribute for the compression
+                # level, hence the private _compresslevel.
+                dst_info.compress_type = compression
+                dst_info._compresslevel = zip_level or None
+                with src_open(info) as src_f, dst_open(dst_info, "w") as dst_f:
+                    copyfileobj(src_f, dst_f, length=ZIP_COPY_BUFFER_SIZE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Script to split all Moodle submissions into batches that will be "
+                                                 "assigned to a given list of tutors, according to their employment "
+                                                 "hours.")
+    parser.add_argument("-sf", "--submissions_file", type=str, required=True,
+                        help="Moodle ZIP file containing all submissions.")
+    parser.add_argument("-n", "--number", type=int,
+                        help="Exercise number. If not specified, the Moodle ZIP filename is parsed to search for "
+                             "various names (see '--exercise_names') and a following number (separated by arbitrary "
+                             "whitespace characters, dashes or underscores). The number is used to roll the tutors, "
+                             "i.e., to shift them across the created submission splits (e.g., if the tutors are "
+                             "['A', 'B', 'C'] and the number is 1, then they are shifted by one, which results in "
+                             "['C', 'A', 'B']). Use the value 0 if no such shift should be applied.")
+    parser.add_argument("--exercise_names", type=str, nargs="+",
+                        default=["Assignment", "Exercise", "UE", "Übung", "Aufgabe"],
+                        help="List of case-sensitive exercise names which will be used to automatically infer the "
+                             "exercise number from the Moodle ZIP filename. The number is assumed to follow one "
+                             "of these names, separated by arbitrary whitespace characters, dashes or underscores. "
+                             "Default: ['Assignment', 'Exercise', 'UE', 'Übung', 'Aufgabe']")
+    tutors_group = parser.add_mutually_exclusive_group(required=True)
+    tutors_group.add_argument("-tf", "--tutors_file", type=str,
+                              help="File containing tutor names (one name per line, no header). Optionally, a second "
+                                   "column (separated via a comma) can be provided that contains weights per tutor "
+                                   "that specify how the submission split sizes should be distributed. If no weights "
+                                   "are specified, then an equal split size distribution is assumed.")
+    tutors_group.add_argument("-tl", "--tutors_list", type=str, nargs="+",
+                              help="List of tutor names. Optionally, a second entry (separated via a comma) can be "
+                                   "provided that contains weights per tutor that specify how the submission split "
+                                   "sizes should be distributed. If no weights are specified, then an equal split "
+                                   "size distribution is assumed.")
+    parser.add_argument("--zip_level", type=int, default=0,
+                        help="ZIP compression level for the created tutor ZIP files. The default of 0 stores the "
+                             "files without compression, which is usually the best choice since submissions mostly "
+                             "consist of already-compressed formats (ZIP, PDF, DOCX, images, etc.) where another "
+                             "compression pass costs CPU time for practically no size reduction. Values from 1 "
+                             "(fastest) to 9 (smallest) enable DEFLATE compression; level 1 is typically 2-3x faster "
+                             "than the zlib default level 6 at only marginally larger output. Default: 0")
+    parser.add_argument("--print_abs_paths", action="store_true",
+                        help="If specified, the printed output will show the absolute paths of all files. Otherwise, "
+                             "only the base filenames will be printed (default).")
+    parser.add_argument("--create_overview_file", action="store_true",
+                        help="If specified, an overview CSV file will be created that contains all information on the "
+                             "individual submissions and how they were distributed to the different tutors. This is "
+                             "useful to quickly check which tutor corrected which submission. The name of the "
+                             "overview file will be the same as '--submissions_file' but with the extension replaced "
+                             "with '.csv'. If '--info_file' was also specified, then all the information within this "
+                             "info file is also added to the overview CSV file.")
+    parser.add_argument("--sorting_keys", type=str, nargs="+", default=[],
+                        help="If specified, the submissions will be sorted according to these keys. The keys must be "
+                             "part of the header entries in the '--info_file', so this argument must be specified in "
+                             "addition. By default, the submissions will simply be sorted according to their names.")
+    parser.add_argument("--submission_renaming_keys", type=str, nargs="+", default=[],
+                        help="If specified, the submissions will be renamed according to these keys. The renaming "
+                             "will be as follows: <key_1><sep><key_2>...<sep><key_n>, where <key_i> is the i-th key "
+                             "of these specified renaming keys and <sep> is the separator as defined by argument "
+                             "'--submission_renaming_separator'. The keys must be part of the header entries in the "
+                             "'--info_file', so this argument must be specified in addition. Note that these keys "
+                             "should lead to unique values for each submission, since otherwise, duplicate submission "
+                             "names would be created, which leads to overwriting and hence loss of data. By default, "
+                             "the original submission names will be used.")
+    parser.add_argument("--submission_renaming_separator", type=str, default="_",
+                        help="The separator to use when renaming submissions (see '--submission_renaming_keys'). Has "
+                             "no effect in case '--submission_renaming_keys' is not set. Default: '_'")
+    parser.add_argument("--info_file", type=str,
+                        help="If specified, this must be a CSV file containing student (meta-)data that can be used "
+                             "for sorting and renaming submissions. The CSV file must include a header, and these "
+                             "exact header entries can be used as sort/renaming keys as defined by arguments "
+                             "'--sorting_keys' and '--submission_renaming_keys', respectively. Typically, this is the "
+                             "course participants file that can be downloaded in the participants overview in Moodle. "
+                             "Important: Please ensure that this file is consistent with the '--submissions_file' in "
+                             "the sense that they contain the same metadata. For instance, name changes might occur "
+                             "during a semester. When downloading this info file only once at the start of the "
+                             "semester, such changes are not reflected, and it would then be inconsistent to the "
+                             "up-to-day '--submissions_file', which leads to errors.")
+    parser.add_argument("--info_file_first_name_key", type=str,
+                        help="Only relevant if '--sorting_keys' is specified. If so, this argument indicates the "
+                             "header entry in the '--info_file' which contains the first name. Must be specified "
+                             "together with argument '--info_file_last_name_key'. If not specified, then the first "
+                             "name header entry is tried to be identified automatically based on string matching.")
+    parser.add_argument("--info_file_last_name_key", type=str,
+                        help="Only relevant if '--sorting_keys' is specified. If so, this argument indicates the "
+                             "header entry in the '--info_file' which contains the last name. Must be specified "
+                             "together with argument '--info_file_first_name_key'. If not specified, then the last "
+                             "name header entry is tried to be identified automatically based on string matching.")
+    args = parser.parse_args()
+
+    if not 0 <= args.zip_level <= 9:
+        raise ValueError("'--zip_level' must be in the range [0, 9]")
+    if args.sorting_keys and args.info_file is None:
+        raise ValueError("must also specify '--info_file' when specifying '--sorting_keys'")
+    if args.submission_renaming_keys and args.info_file is None:
+        raise ValueError("must also specify '--info_file' when specifying '--submission_renaming_keys'")
+    if args.sorting_keys and bool(args.info_file_first_name_key) != bool(args.info_file_last_name_key):
+        raise ValueError("must specify either both or none of '--info_file_first_name_key' and "
+                         "'info_file_last_name_key'")
+    if args.info_file:
+        # Read as string data type to avoid inconsistent states for IDs (most notably, matriculation IDs with leading
+        # zeros, where the zeros would be dropped here if the IDs were interpreted as integers)
+        info_df = pd.read_csv(args.info_file, dtype=str)
+
+        def check_keys(keys, arg_name):
+            for k in keys:
+                if k not in info_df.columns:
+                    raise ValueError(f"'--{arg_name}' contains '{k}' which is not part of the header entries in "
+                                     f"'--info_file': {info_df.columns.to_list()}")
+
+        if args.sorting_keys:
+            check_keys(args.sorting_keys, "sorting_keys")
+            if args.info_file_first_name_key:
+                check_keys([args.info_file_first_name_key], "info_file_first_name_key")
+            if args.info_file_last_name_key:
+                check_keys([args.info_file_last_name_key], "info_file_last_name_key")
+        if args.submission_renaming_keys:
+            check_keys(args.submission_renaming_keys, "submission_renaming_keys")
+            renaming_info_df = info_df[args.submission_renaming_keys]
+            duplicates = renaming_info_df[renaming_info_df.duplicated()].drop_duplicates().reset_index(drop=True)
+            if len(duplicates) > 0:
+                raise ValueError(f"'--submission_renaming_keys' ({args.submission_renaming_keys}) leads to the "
+                                 f"following duplicate renaming values:\n{duplicates}\nMust choose different "
+                                 f"renaming keys")
+    else:
+        info_df = None
+
+    # If the number of the exercise is specified, use it. Otherwise, try to extract/infer it from the submission
+    # filename.
+    exercise_num = args.number if args.number is not None else \
+        extract_exercise_number(args.submissions_file, args.exercise_names)
+
+    tutors_df = pd.read_csv(args.tutors_file, header=None) if args.tutors_file is not None else \
+        extract_weighted_tutors(args.tutors_list)
+    assert len(tutors_df.columns) == 1 or len(tutors_df.columns) == 2
+    # Assign equal default weights if only tutor names were specified to ensure we have a weight column.
+    if len(tutors_df.columns) == 1:
+        tutors_df[1] = 1
+    tutors_df.columns = ["name", "weight"]
+    # Shift the tutors across the splits with a single positional take instead of rolling the name and weight columns
+    # separately through np.roll (one allocation instead of two, and the columns trivially stay aligned).
+    order = (np.arange(len(tutors_df)) - exercise_num) % len(tutors_df)
+    tutors_df = tutors_df.iloc[order].reset_index(drop=True)
+    # Handle duplicate tutor names by simply adding increasing numbers after the name.
+    handle_duplicate_names(tutors_df)
+
+    print(f"reading submissions ZIP file '{get_file_path(args.submissions_file, args.print_abs_paths)}'")
+    with zipfile.ZipFile(args.submissions_file, "r") as f:
+        # The archive listing already contains every top-level submission directory, so there is no need to extract
+        # the archive to disk at all — the tutor ZIP files are later built by streaming the entries directly from the
+        # archive (ZIP entry names always use "/" as separator, independent of the platform).
+        submission_dirs = sorted({name.split("/", 1)[0] for name in f.namelist() if name})
+    # To extract data, the following format is assumed for each submission (correct at the time of writing this code):
+    # <full student name>_<7-digit moodle ID>_<rest of submission string>
+    # where <full student name> is a space-separated list of strings that holds the full student name, i.e., all first
+    # names and all last names (however, we do not know which parts belong to first names and which to last names),
+    # <7-digit moodle ID> is an ID with 7 digits generated by Moodle, and <rest of submission string> can be an
+    # arbitrary string (at the time of writing this code, this is the string "assignsubmission_file_").
+    # TODO: create arguments for all these columns and regex patterns in case the Moodle format changes (currently,
+    #  this would require code modification right here)
+    submissions_df = get_submissions_df(submission_dirs, regex_cols={
+        FULL_NAME_COL: FULL_NAME_REGEX,  # Extract the full name according to the above format.
+        MOODLE_ID_COL: MOODLE_ID_REGEX,  # Extract the 7-digit Moodle ID according to the above format.
+        SUBMISSION_COL: None,  # This is simply the entire submission (no specific extraction of a pattern).
+    })
+    if args.info_file:
+        first_name_col = args.info_file_first_name_key
+        last_name_col = args.info_file_last_name_key
+        if first_name_col is None:
+            first_name_col, last_name_col = match_full_names(submissions_df[FULL_NAME_COL], info_df)
+            print(f"identified '{first_name_col}' as first name column and '{last_name_col}' as last name column")
+        info_df[FULL_NAME_COL] = info_df[first_name_col] + " " + info_df[last_name_col]
+        # Use a shared categorical dtype for the join key: pandas then merges on the integer category codes instead
+        # of hashing the full name strings, which is faster and lighter on memory for large courses. Both sides must
+        # get the exact same categories, since otherwise pandas falls back to the slow object-dtype path again. The
+        # categories must not contain null values (categorical NaNs are represented outside the categories), which
+        # can occur here, e.g., through empty name cells of participants who never submitted; such rows simply stay
+        # NaN after the cast, just like with the plain string join key before.
+        full_name_dtype = pd.CategoricalDtype(
+            pd.concat([submissions_df[FULL_NAME_COL], info_df[FULL_NAME_COL]], ignore_index=True).dropna().unique())
+        submissions_df[FULL_NAME_COL] = submissions_df[FULL_NAME_COL].astype(full_name_dtype)
+        info_df[FULL_NAME_COL] = info_df[FULL_NAME_COL].astype(full_name_dtype)
+        # Join against the indexed info file: pandas then only builds a hash table on the (indexed) info side and
+        # looks the submissions up in it, rather than hashing both sides as pd.merge would.
+        merged_df = submissions_df.join(info_df.set_index(FULL_NAME_COL), on=FULL_NAME_COL, how="inner")
+        no_duplicates = merged_df.drop_duplicates(subset=FULL_NAME_COL, keep=False)
+        duplicates = merged_df.loc[~merged_df.index.isin(no_duplicates.index)]
+        if len(submissions_df) != len(merged_df):
+            raise ValueError(f"duplicate names detected:\n{duplicates}")
+        if args.sorting_keys:
+            print(f"sorting submissions according to: {', '.join(args.sorting_keys)}")
+            merged_df.sort_values(by=args.sorting_keys, inplace=True)
+        submissions_df = merged_df
+    else:
+        submissions_df.sort_values(SUBMISSION_COL, inplace=True)
+
     if args.submission_renaming_keys:
-        check_keys(args.submission_renaming_keys, "submission_renaming_keys")
-        renaming_info_df = info_df[args.submission_renaming_keys]
-        duplicates = renaming_info_df[renaming_info_df.duplicated()].drop_duplicates().reset_index(drop=True)
-        if len(duplicates) > 0:
-            raise ValueError(f"'--submission_renaming_keys' ({args.submission_renaming_keys}) leads to the following "
-                             f"duplicate renaming values:\n{duplicates}\nMust choose different renaming keys")
-else:
-    info_df = None
-
-# If the number of the exercise is specified, use it. Otherwise, try to extract/infer it from the submission filename.
-exercise_num = args.number if args.number is not None else \
-    extract_exercise_number(args.submissions_file, args.exercise_names)
-
-tutors_df = pd.read_csv(args.tutors_file, header=None) if args.tutors_file is not None else \
-    extract_weighted_tutors(args.tutors_list)
-assert len(tutors_df.columns) == 1 or len(tutors_df.columns) == 2
-# Assign equal default weights if only tutor names were specified to ensure we have a weight column.
-if len(tutors_df.columns) == 1:
-    tutors_df[1] = 1
-tutors_df.columns = ["name", "weight"]
-tutors_df["name"] = np.roll(tutors_df["name"], exercise_num)
-tutors_df["weight"] = np.roll(tutors_df["weight"], exercise_num)
-# Handle duplicate tutor names by simply adding increasing numbers after the name.
-handle_duplicate_names(tutors_df)
-
-unzip_dir = args.submissions_file + "_UNZIPPED"
-print(f"extracting submissions ZIP file to '{get_file_path(unzip_dir, args.print_abs_paths)}'")
-with zipfile.ZipFile(args.submissions_file, "r") as f:
-    f.extractall(unzip_dir)
-# To extract data, the following format is assumed for each submission (correct at the time of writing this code):
-# <full student name>_<7-digit moodle ID>_<rest of submission string>
-# where <full student name> is a space-separated list of strings that holds the full student name, i.e., all first
-# names and all last names (however, we do not know which parts belong to first names and which to last names),
-# <7-digit moodle ID> is an ID with 7 digits generated by Moodle, and <rest of submission string> can be an arbitrary
-# string (at the time of writing this code, this is the string "assignsubmission_file_").
-# TODO: create arguments for all these columns and regex patterns in case the Moodle format changes (currently, this
-#  would require code modification right here)
-submissions_df = get_submissions_df(os.listdir(unzip_dir), regex_cols={
-    FULL_NAME_COL: r".+(?=_\d{7})",  # Extract the full name according to the above format.
-    MOODLE_ID_COL: r"\d{7}",  # Extract the 7-digit Moodle ID according to the above format.
-    SUBMISSION_COL: r".+",  # This is simply the entire submission (no specific extraction of a pattern).
-})
-if args.info_file:
-    first_name_col = args.info_file_first_name_key
-    last_name_col = args.info_file_last_name_key
-    if first_name_col is None:
-        first_name_col, last_name_col = match_full_names(submissions_df[FULL_NAME_COL], info_df)
-        print(f"identified '{first_name_col}' as first name column and '{last_name_col}' as last name column")
-    info_df[FULL_NAME_COL] = info_df[first_name_col] + " " + info_df[last_name_col]
-    merged_df = pd.merge(submissions_df, info_df, on=FULL_NAME_COL, how="inner")
-    no_duplicates = merged_df.drop_duplicates(subset=FULL_NAME_COL, keep=False)
-    duplicates = merged_df.loc[~merged_df.index.isin(no_duplicates.index)]
-    if len(submissions_df) != len(merged_df):
-        raise ValueError(f"duplicate names detected:\n{duplicates}")
-    if args.sorting_keys:
-        print(f"sorting submissions according to: {', '.join(args.sorting_keys)}")
-        merged_df.sort_values(by=args.sorting_keys, inplace=True)
-    submissions_df = merged_df
-else:
-    submissions_df.sort_values(SUBMISSION_COL, inplace=True)
-
-if args.submission_renaming_keys:
-    name_format = args.submission_renaming_separator.join(f"<{k}>" for k in args.submission_renaming_keys)
-    print(f"renaming submissions according to the following format: {name_format}")
-
-if args.create_overview_file:
-    overview_file = os.path.splitext(args.submissions_file)[0] + ".csv"
-    print(f"storing overview file to '{get_file_path(overview_file, args.print_abs_paths)}'")
-else:
-    overview_file = None
-
-print(f"distributing {len(submissions_df)} submissions among the following {len(tutors_df)} tutors:")
-print(tutors_df)
-chunk_dfs, next_chunk_idx = weighted_chunks(submissions_df, tutors_df["weight"])
-for i, chunk_df in enumerate(chunk_dfs):
-    chunk_file = f"{args.submissions_file[:-4]}_{tutors_df['name'].iloc[i]}.zip"
-    with zipfile.ZipFile(chunk_file, "w") as f:
-        # Write all files from the submission directory to the tutors ZIP file. Must exclude directories, since glob
-        # includes them. Also specify the relative path as name in the ZIP file (arcname), as otherwise, the full
-        # absolute path would be stored in the ZIP file.
-        for _, entry in chunk_df.iterrows():
-            for file in glob(os.path.join(unzip_dir, entry[SUBMISSION_COL], "**"), recursive=True):
-                if os.path.isfile(file):
-                    if args.submission_renaming_keys:
-                        name = args.submission_renaming_separator.join(entry[k] for k in args.submission_renaming_keys)
-                        name = os.path.join(name, os.path.basename(file))
-                    else:
-                        name = file[len(unzip_dir) + 1:]
-                    f.write(file, arcname=name)
-    
+        name_format = args.submission_renaming_separator.join(f"<{k}>" for k in args.submission_renaming_keys)
+        print(f"renaming submissions according to the following format: {name_format}")
+
+    if args.create_overview_file:
+        overview_file = os.path.splitext(args.submissions_file)[0] + ".csv"
+        print(f"storing overview file to '{get_file_path(overview_file, args.print_abs_paths)}'")
+    else:
+        overview_file = None
+
+    print(f"distributing {len(submissions_df)} submissions among the following {len(tutors_df)} tutors:")
+    print(tutors_df)
+    chunk_dfs, next_chunk_idx = weighted_chunks(submissions_df, tutors_df["weight"])
+    # Creating the tutor ZIP files is CPU-bound (compression) and the individual ZIP files are completely independent
+    # of each other, so each one is built in its own worker process. The overview file is written in the main process
+    # (in chunk order), since it only depends on the chunk DataFrames, not on the finished ZIP files.
+    # Only the submission name and the renaming values are needed per worker task, so the payload is built by zipping
+    # the corresponding column arrays into plain tuples instead of materializing every row (with all merged info file
+    # columns) as a dict or Series.
+    payload_cols = [SUBMISSION_COL] + list(args.submission_renaming_keys)
+    overview_chunk_dfs = []
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = {}
+        for i, chunk_df in enumerate(chunk_dfs):
+            chunk_file = f"{args.submissions_file[:-4]}_{tutors_df['name'].iloc[i]}.zip"
+            entries = list(zip(*(chunk_df[c].to_numpy() for c in payload_cols)))
+            future = executor.submit(build_tutor_zip, chunk_file, args.submissions_file, entries,
+                                     args.submission_renaming_separator, args.zip_level)
+            futures[future] = (chunk_file, chunk_df)
+
+            if args.create_overview_file:
+                # Only collect the annotated chunks here; the overview file itself is written in one go after the
+                # loop, so it is not reopened and appended to once per tutor. The scalar .iat lookups avoid the
+                # reindex/broadcast overhead of assigning a whole tutors_df row slice per chunk.
+                overview_chunk_dfs.append(chunk_df.assign(tutor_name=tutors_df["name"].iat[i],
+                                                          tutor_weight=tutors_df["weight"].iat[i],
+                                                          tutor_file=os.path.basename(chunk_file)))
+
+        for i, future in enumerate(as_completed(futures)):
+            future.result()
+            chunk_file, chunk_df = futures[future]
+            print(f"[{i + 1:{len(str(len(tutors_df)))}d}/{len(tutors_df)}] {len(chunk_df):3d} submissions ---> "
+                  f"{get_file_path(chunk_file, args.print_abs_paths)}")
+
     if args.create_overview_file:
         assert overview_file is not None
-        chunk_df[["tutor_name", "tutor_weight"]] = tutors_df[["name", "weight"]].iloc[i].values
-        chunk_df["tutor_file"] = os.path.basename(chunk_file)
-        # The first chunk (i == 0) is handled differently: First, the file will be newly created (mode "w"). Second, the
-        # header will be written. In all following cases (i >= 1), submissions will simply be appended (mode "a") and no
-        # header will be written anymore (not needed since it already exists because of the first chunk at i == 0).
-        first_chunk = i == 0
-        chunk_df.to_csv(overview_file, mode="w" if first_chunk else "a", header=first_chunk, index=False)
-    
-    print(f"[{i + 1:{len(str(len(tutors_df)))}d}/{len(tutors_df)}] {len(chunk_df):3d} submissions ---> "
-          f"{get_file_path(chunk_file, args.print_abs_paths)}")
-
-print(f"next submission would be distributed to: {tutors_df['name'].iloc[next_chunk_idx]}")
-print(f"deleting extracted submissions directory '{get_file_path(unzip_dir, args.print_abs_paths)}'")
-shutil.rmtree(unzip_dir, ignore_errors=True)
+        pd.concat(overview_chunk_dfs, ignore_index=True).to_csv(overview_file, index=False)
+
+    print(f"next submission would be distributed to: {tutors_df['name'].iloc[next_chunk_idx]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,74 @@
 import argparse
+import functools
+import hashlib
 import os
 import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv  # noqa: F401 # Submodule must be imported explicitly.
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+# Columns actually used from the grading files and from the tutors overview files. The "Vorname"/"Nachname" columns
+# needed for '--print_missing' come from the tutors overview file (split.py writes the info file columns into it);
+# the Moodle grading worksheet only contains a combined "Vollständiger Name". Restricting the CSV reads to these
+# columns proportionally cuts both the parsing work and the allocated memory, which adds up for wide Moodle exports.
+GRADING_FILE_COLS = ("Status", "Bewertung kann geändert werden", "ID-Nummer")
+TUTORS_OVERVIEW_FILE_COLS = ("ID-Nummer", "tutor_name", "Vorname", "Nachname")
+
+
+def read_csv(file, usecols=None, cache_dir=None):
+    # If caching is enabled, the parsed DataFrame is stored as a pickle file keyed by the CSV file's absolute path,
+    # modification time, size and the selected columns. Loading the pickle on subsequent runs is essentially a plain
+    # memory copy and skips the (dominating) CSV parsing cost entirely; any change to the CSV file changes the key, so
+    # stale data is never returned.
+    if cache_dir is not None:
+        file_stat = os.stat(file)
+        key = repr((os.path.abspath(file), file_stat.st_mtime_ns, file_stat.st_size, usecols))
+        cache_file = os.path.join(cache_dir, hashlib.md5(key.encode()).hexdigest() + ".pkl")
+        if os.path.exists(cache_file):
+            return pd.read_pickle(cache_file)
+    df = _parse_csv(file, usecols)
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        df.to_pickle(cache_file)
+    return df
+
+
+def _parse_csv(file, usecols):
+    # PyArrow's CSV parser is multi-threaded and considerably faster than the default pandas engine, and the
+    # Arrow-backed string columns speed up the subsequent str.contains filters as well. Since pyarrow is an optional
+    # dependency, fall back to the default engine if it is not installed. In both cases, the data is read as string
+    # data type to avoid inconsistent states for IDs (most notably, matriculation IDs with leading zeros, where the
+    # zeros would be dropped if the IDs were interpreted as integers).
+    # The header is read separately first (cheap compared to parsing the full file): not every export necessarily
+    # contains all requested columns (e.g., the name columns), and both parsers fail on requested columns that do not
+    # exist, so the requested columns must be intersected with the actually existing ones.
+    header_cols = pd.read_csv(file, nrows=0).columns
+    if usecols is not None:
+        usecols = [c for c in header_cols if c in usecols]
+    if HAS_PYARROW:
+        # pyarrow.csv is used directly instead of pd.read_csv(engine="pyarrow"), because the latter only applies the
+        # requested dtypes after its own type inference — an ID like "0012345" would be inferred as integer first and
+        # end up as the string "12345", even with explicit per-column string dtypes. ConvertOptions.column_types, in
+        # contrast, forces the string type at parse time, so no inference happens at all.
+        # strings_can_be_null makes empty cells come out as null instead of "", like with the pandas parser.
+        convert_options = pa.csv.ConvertOptions(column_types={c: pa.string() for c in header_cols},
+                                                include_columns=usecols, strings_can_be_null=True)
+        return pa.csv.read_csv(file, convert_options=convert_options).to_pandas(types_mapper=pd.ArrowDtype)
+    return pd.read_csv(file, dtype=str, usecols=usecols)
+
 
 # TODO: lots of hard-coded assumptions (should be parameterized)
-def get_missing_df(grading_file, tutors_overview_file):
-    grading_df = pd.read_csv(grading_file, dtype=str)
+def get_missing_df(grading_file, tutors_overview_file, cache_dir=None):
+    grading_df = read_csv(grading_file, usecols=GRADING_FILE_COLS, cache_dir=cache_dir)
     # Exclude the following entries:
     # 1) "Status" contains " - Bewertet" (was already graded)
     # 2) "Status" contains "Keine Abgabe" (cannot be graded; it might be that is does contain a grade due to
@@ -15,10 +76,21 @@ def get_missing_df(grading_file, tutors_overview_file):
     #    in actually submitted entries that are not graded yet, so we can skip all these entries here)
     # 3) "Bewertung kann geändert werden" equals "Nein" (was already graded, but the grading was done via an alternative
     #    CSV upload in Moodle, which, oddly enough, does not change the "Status")
-    missing_df = grading_df[~(grading_df["Status"].str.contains(" - Bewertet") |
-                              grading_df["Status"].str.contains("Keine Abgabe") |
-                              (grading_df["Bewertung kann geändert werden"] == "Nein"))]
-    tutors_df = pd.read_csv(tutors_overview_file, dtype=str)
+    # Both "Status" checks are fused into a single regex alternation, so the column is only scanned once.
+    graded_or_not_submitted = grading_df["Status"].str.contains(r" - Bewertet|Keine Abgabe", regex=True, na=False)
+    not_changeable = grading_df["Bewertung kann geändert werden"].eq("Nein")
+    missing_df = grading_df[~(graded_or_not_submitted | not_changeable)]
+    tutors_df = read_csv(tutors_overview_file, usecols=TUTORS_OVERVIEW_FILE_COLS, cache_dir=cache_dir)
+    # Use a shared categorical dtype for the join key: pandas then merges on the integer category codes instead of
+    # hashing the ID strings. The IDs themselves must stay strings (leading zeros!), so converting them to an actual
+    # integer dtype is not an option. Both sides must get the exact same categories, since otherwise pandas falls
+    # back to the slow object-dtype path again. The categories must not contain null values (categorical NaNs are
+    # represented outside the categories), which can occur here through empty ID cells; such rows simply stay NaN
+    # after the cast, just like with the plain string join key before.
+    id_dtype = pd.CategoricalDtype(pd.concat([missing_df["ID-Nummer"], tutors_df["ID-Nummer"]],
+                                             ignore_index=True).dropna().unique())
+    missing_df = missing_df.assign(**{"ID-Nummer": missing_df["ID-Nummer"].astype(id_dtype)})
+    tutors_df["ID-Nummer"] = tutors_df["ID-Nummer"].astype(id_dtype)
     merged_missing_df = pd.merge(missing_df, tutors_df, on="ID-Nummer")
     unassigned_df = missing_df[~missing_df["ID-Nummer"].isin(merged_missing_df["ID-Nummer"])]
     assert len(unassigned_df) == 0, f"there are students not assigned to tutors:\n{unassigned_df}"
@@ -33,68 +105,111 @@ def extract_assignment_name(grading_file, tutors_overview_file, assignment_name_
     return "assignment"
 
 
-parser = argparse.ArgumentParser(description="Script to check missing Moodle submission corrections (i.e., submissions "
-                                             "that still need to be graded), grouped by the tutors that were assigned "
-                                             "to perform these corrections (see script 'split.py').")
-parser.add_argument("--grading_files", nargs="+", type=str, required=True,
-                    help="List of Moodle grading CSV files, each obtained via 'Download grading worksheet' (German: "
-                         "'Bewertungstabelle herunterladen'). The order of this list must exactly match the order of "
-                         "'--tutors_overview_files'.")
-parser.add_argument("--tutors_overview_files", nargs="+", type=str, required=True,
-                    help="List of tutor overview CSV files, each obtained via the script 'split.py' with argument "
-                         "'--create_overview_file' enabled. The order of this list must exactly match the order of "
-                         "'--grading_files'.")
-parser.add_argument("--assignment_name_regex", type=str, default=r"Assignment \d+",
-                    help="Regular expression for extracting the assignment name out of every entry in"
-                         " '--grading_files' or, if no match is found, every entry in '--tutors_overview_files'. If no "
-                         "match is found here either, the string 'assignment' is used as fallback value. Default: "
-                         r"'Assignment \d+'")
-parser.add_argument("--print_missing", action="store_true",
-                    help="If specified, all individual student submission where the feedback/grading is still missing "
-                         "are printed to the console.")
-parser.add_argument("--skip_sanity_check", action="store_true",
-                    help="If specified, skips the sanity check which matches each file of '--grading_files' with each "
-                         "file of '--tutors_overview_files'. This check is based on the default (Moodle) filenames, so "
-                         "if the provided '--grading_files' and '--tutors_overview_files' differ from this default "
-                         "naming format, then this check should be disabled or it will most likely fail.")
-args = parser.parse_args()
-
-if len(args.grading_files) != len(args.tutors_overview_files):
-    raise ValueError("grading_files must match tutors_overview_files exactly")
-
-if args.print_missing:
-    pd.options.display.max_rows = 100
-    pd.options.display.max_columns = 100
-    pd.options.display.expand_frame_repr = False
-
-for gf, tof in zip(args.grading_files, args.tutors_overview_files):
-    gf_basename = os.path.basename(gf)
-    tof_basename = os.path.basename(tof)
-    # Small sanity check if we are comparing matching files. This only works in case of default (Moodle) filenames
+def main():
+    parser = argparse.ArgumentParser(description="Script to check missing Moodle submission corrections (i.e., "
+                                                 "submissions that still need to be graded), grouped by the tutors "
+                                                 "that were assigned to perform these corrections (see script "
+                                                 "'split.py').")
+    parser.add_argument("--grading_files", nargs="+", type=str, required=True,
+                        help="List of Moodle grading CSV files, each obtained via 'Download grading worksheet' "
+                             "(German: 'Bewertungstabelle herunterladen'). The order of this list must exactly match "
+                             "the order of '--tutors_overview_files'.")
+    parser.add_argument("--tutors_overview_files", nargs="+", type=str, required=True,
+                        help="List of tutor overview CSV files, each obtained via the script 'split.py' with argument "
+                             "'--create_overview_file' enabled. The order of this list must exactly match the order "
+                             "of '--grading_files'.")
+    parser.add_argument("--assignment_name_regex", type=str, default=r"Assignment \d+",
+                        help="Regular expression for extracting the assignment name out of every entry in"
+                             " '--grading_files' or, if no match is found, every entry in '--tutors_overview_files'. "
+                             "If no match is found here either, the string 'assignment' is used as fallback value. "
+                             r"Default: 'Assignment \d+'")
+    parser.add_argument("--cache_dir", type=str,
+                        help="If specified, parsed CSV files are cached as pickle files in this directory (created "
+                             "if it does not exist), keyed by file path, modification time and size. Repeated runs "
+                             "on unchanged files then skip the CSV parsing entirely and only load the pickle, which "
+                             "is considerably faster. Changed files are automatically re-parsed due to the key; "
+                             "outdated cache files are not cleaned up automatically, though, so the directory may "
+                             "have to be emptied manually from time to time.")
+    parser.add_argument("--print_missing", action="store_true",
+                        help="If specified, all individual student submission where the feedback/grading is still "
+                             "missing are printed to the console.")
+    parser.add_argument("--skip_sanity_check", action="store_true",
+                        help="If specified, skips the sanity check which matches each file of '--grading_files' with "
+                             "each file of '--tutors_overview_files'. This check is based on the default (Moodle) "
+                             "filenames, so if the provided '--grading_files' and '--tutors_overview_files' differ "
+                             "from this default naming format, then this check should be disabled or it will most "
+                             "likely fail.")
+    args = parser.parse_args()
+
+    if len(args.grading_files) != len(args.tutors_overview_files):
+        raise ValueError("grading_files must match tutors_overview_files exactly")
+
+    if args.print_missing:
+        pd.options.display.max_rows = 100
+        pd.options.display.max_columns = 100
+        pd.options.display.expand_frame_repr = False
+
+    basenames = [(os.path.basename(gf), os.path.basename(tof))
+                 for gf, tof in zip(args.grading_files, args.tutors_overview_files)]
+    # Small sanity check if we are comparing matching files. This only works in case of default (Moodle) filenames.
+    # Run all checks up front, so no worker processes are spawned at all for mismatching input.
     if not args.skip_sanity_check:
-        # Expected grading filename format: Bewertungen-<COURSE>-<ASSIGNMENT>-<FIXED_ID>.csv
-        # Expected tutors overview filename format:     <COURSE>-<ASSIGNMENT>-<FIXED_ID>.csv
-        if gf_basename[-len(tof_basename):] != tof_basename:
-            raise ValueError(f"failed sanity check: mismatching files:\n-> {gf_basename}\n-> {tof_basename}")
-    
-    print(f"Grading file:  {gf_basename}")
-    print(f"Overview file: {tof_basename}")
-    print("-" * 75)
-    mdf = get_missing_df(gf, tof)
-    tutor_groups = mdf.groupby("tutor_name")
-    assignment_name = extract_assignment_name(gf_basename, tof_basename, args.assignment_name_regex)
-    
-    for i, (tutor, group_df) in enumerate(tutor_groups):
-        print(f"[{i + 1}/{len(tutor_groups)}] {tutor}: {len(group_df)} missing {assignment_name} "
-              f"feedback{'' if len(group_df) == 1 else 's'}")
-        if args.print_missing:
-            # TODO: hard-coded column names
-            print_df = group_df.reset_index(drop=True)
-            if "Vorname" in group_df and "Nachname" in group_df and "ID-Nummer" in group_df:
-                print_df.rename(columns={"Vorname": "first_name", "Nachname": "last_name", "ID-Nummer": "id"},
-                                inplace=True)
-                print_df = print_df[["first_name", "last_name", "id"]]
-                print(print_df)
-            else:
+        for gf_basename, tof_basename in basenames:
+            # Expected grading filename format: Bewertungen-<COURSE>-<ASSIGNMENT>-<FIXED_ID>.csv
+            # Expected tutors overview filename format:     <COURSE>-<ASSIGNMENT>-<FIXED_ID>.csv
+            if not gf_basename.endswith(tof_basename):
+                raise ValueError(f"failed sanity check: mismatching files:\n-> {gf_basename}\n-> {tof_basename}")
+
+    # The file pairs are completely independent of each other and the time is dominated by CSV parsing and merging,
+    # so each pair is processed in its own worker process. The results are printed serially afterwards; map preserves
+    # the input order, so the output order is the same as before.
+    with ProcessPoolExecutor() as executor:
+        missing_dfs = list(executor.map(functools.partial(get_missing_df, cache_dir=args.cache_dir),
+                                        args.grading_files, args.tutors_overview_files))
+
+    # Group all pairs in one go: the tutors usually repeat across the pairs, so a single hash build over the
+    # concatenated rows is cheaper than one groupby per pair. An additional pair index column keeps the groups
+    # separable per file pair. Grouping on a categorical tutor key lets pandas group on integer category codes
+    # instead of hashing tutor name strings; observed=True restricts the grouping to the categories that actually
+    # occur. The group order stays sorted per pair (categories are sorted on creation), which defines the printed
+    # tutor order.
+    # The concat unions the columns across all pairs, filling columns that a pair does not have with NaN. Whether a
+    # pair actually contains the name columns (see the '--print_missing' check below) must therefore be decided from
+    # that pair's own pre-concat columns, and the fallback print must be restricted to them as well — otherwise, one
+    # overview file with name columns would make every pair take the name-based print path, with NaN names for the
+    # pairs that lack them.
+    pair_cols = [list(mdf.columns) for mdf in missing_dfs]
+    all_missing_df = pd.concat([mdf.assign(_pair=i) for i, mdf in enumerate(missing_dfs)], ignore_index=True)
+    all_missing_df["tutor_name"] = all_missing_df["tutor_name"].astype("category")
+    pair_tutor_groups = defaultdict(list)
+    for (pair, tutor), group_df in all_missing_df.groupby(["_pair", "tutor_name"], observed=True):
+        pair_tutor_groups[pair].append((tutor, group_df))
+
+    for pair, (gf_basename, tof_basename) in enumerate(basenames):
+        print(f"Grading file:  {gf_basename}")
+        print(f"Overview file: {tof_basename}")
+        print("-" * 75)
+        tutor_groups = pair_tutor_groups[pair]
+        n_groups = len(tutor_groups)
+        assignment_name = extract_assignment_name(gf_basename, tof_basename, args.assignment_name_regex)
+
+        for i, (tutor, group_df) in enumerate(tutor_groups):
+            count = len(group_df)
+            print(f"[{i + 1}/{n_groups}] {tutor}: {count} missing {assignment_name} "
+                  f"feedback{'' if count == 1 else 's'}")
+            if args.print_missing:
+                # TODO: hard-coded column names
+                if {"Vorname", "Nachname", "ID-Nummer"}.issubset(pair_cols[pair]):
+                    # Build the printed frame with a single constructor instead of the former reset_index + rename +
+                    # column subset chain, which produced three successive DataFrame copies per tutor group.
+                    print_df = pd.DataFrame({"first_name": group_df["Vorname"].to_numpy(),
+                                             "last_name": group_df["Nachname"].to_numpy(),
+                                             "id": group_df["ID-Nummer"].to_numpy()})
+                else:
+                    print_df = group_df[pair_cols[pair]].reset_index(drop=True)
                 print(print_df)
-    print("-" * 75)
+        print("-" * 75)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
+import functools
 import itertools
-import math
 import os.path
 import re
-from collections import namedtuple, defaultdict
+from collections import namedtuple
 from collections.abc import Iterable, Sequence
 
 import numpy as np
@@ -12,54 +12,86 @@ import pandas as pd
 # TODO: handle empty tutors and submissions
 
 
+@functools.lru_cache(maxsize=None)
+def _compile_exercise_regex(exercise_names: tuple[str, ...]) -> re.Pattern:
+    # Combine all exercise names into a single alternation pattern, so the filename only needs to be scanned once
+    # instead of once per name. The compiled pattern is cached per unique tuple of names, so repeated calls do not
+    # pay the compilation cost again.
+    return re.compile("(?:" + "|".join(re.escape(ex_name) for ex_name in exercise_names) + r")[\s\-_]*(\d+)")
+
+
 def extract_exercise_number(submissions_file: str, exercise_names: Iterable[str]) -> int:
-    for ex_name in exercise_names:
-        match = re.search(rf"{ex_name}[\s\-_]*(\d+)", os.path.basename(submissions_file))
-        if match:
-            return int(match.group(1))
+    match = _compile_exercise_regex(tuple(exercise_names)).search(os.path.basename(submissions_file))
+    if match:
+        return int(match.group(1))
     raise ValueError("could not automatically infer exercise number, must specify manually via '-n'")
 
 
 def extract_weighted_tutors(tutors_list: Sequence[str]) -> pd.DataFrame:
-    # Quick check to determine whether weights are specified.
-    if "," in tutors_list[0]:
-        rows = []
-        for t in tutors_list:
-            if "," not in t:
-                raise ValueError(f"expected ',' in tutor entry '{t}'")
-            name, weight = t.split(",", maxsplit=1)
-            rows.append([name, float(weight)])
-        return pd.DataFrame(rows)
-    for t in tutors_list:
-        if "," in t:
-            raise ValueError(f"unexpected ',' in tutor entry '{t}'")
-    return pd.DataFrame(tutors_list)
+    tutors = pd.Series(tutors_list)
+    has_comma = tutors.str.contains(",", regex=False)
+    # Quick check to determine whether weights are specified. The consistency checks and the name/weight splitting
+    # operate on the entire Series at once instead of looping over the individual entries.
+    if has_comma.iloc[0]:
+        if not has_comma.all():
+            raise ValueError(f"expected ',' in tutor entry '{tutors[~has_comma].iloc[0]}'")
+        split = tutors.str.split(",", n=1, expand=True)
+        return pd.DataFrame({0: split[0], 1: split[1].astype(float)})
+    if has_comma.any():
+        raise ValueError(f"unexpected ',' in tutor entry '{tutors[has_comma].iloc[0]}'")
+    return pd.DataFrame(tutors)
 
 
 def handle_duplicate_names(tutors_df: pd.DataFrame):
     dup = tutors_df["name"].duplicated(keep=False)
-    dup_names = tutors_df["name"][dup]
-    # Create a count for each unique tutor name.
-    counts = dict()
-    
-    def update_and_get_count(name: str):
-        count = counts.get(name, 0)
-        count += 1
-        counts[name] = count
-        return count
-    
+    if not dup.any():
+        return
+    # Number the duplicates of each name with a single vectorized cumcount instead of a per-element Python loop.
+    counts = tutors_df.loc[dup].groupby("name").cumcount() + 1
     # Change DataFrame inplace.
-    tutors_df.loc[dup, "name"] = [f"{dn} ({update_and_get_count(dn)})" for dn in dup_names]
-
-
-def get_submissions_df(submissions: Iterable[str], regex_cols: dict[str, str]) -> pd.DataFrame:
-    data = defaultdict(list)
-    for s in submissions:
-        for name, regex in regex_cols.items():
-            match = re.search(regex, s)
-            if match is None:
-                raise ValueError(f"submission '{s}' does not contain regex pattern '{regex}' for column '{name}'")
-            data[name].append(match.group())
+    tutors_df.loc[dup, "name"] = tutors_df.loc[dup, "name"] + " (" + counts.astype(str) + ")"
+
+
+# Below this many submissions, get_submissions_df extracts the columns with a plain Python loop: the fixed setup
+# overhead of the vectorized str.extract path outweighs its per-row savings for tiny inputs.
+VECTORIZED_EXTRACTION_MIN_SIZE = 100
+
+
+def get_submissions_df(submissions: Iterable[str], regex_cols: dict[str, re.Pattern | None]) -> pd.DataFrame:
+    # The patterns are expected to be precompiled. A value of None means that no pattern extraction should be
+    # performed for this column, i.e., the entire submission string is used as is. The extraction runs as one
+    # vectorized str.extract pass per column instead of a Python-level regex search per submission and column; only
+    # tiny inputs take the loop-based fallback path below.
+    submissions = list(submissions)
+    if len(submissions) < VECTORIZED_EXTRACTION_MIN_SIZE:
+        # The column lists are preallocated with the known size and filled via index assignment, which avoids the
+        # amortized resizing cost of repeated appends.
+        data = {name: [None] * len(submissions) for name in regex_cols}
+        for i, s in enumerate(submissions):
+            for name, regex in regex_cols.items():
+                if regex is None:
+                    data[name][i] = s
+                    continue
+                match = regex.search(s)
+                if match is None:
+                    raise ValueError(f"submission '{s}' does not contain regex pattern '{regex.pattern}' for "
+                                     f"column '{name}'")
+                data[name][i] = match.group()
+        return pd.DataFrame(data)
+    submissions = pd.Series(submissions)
+    data = {}
+    for name, regex in regex_cols.items():
+        if regex is None:
+            data[name] = submissions
+            continue
+        # str.extract requires exactly one capture group, so wrap the whole pattern accordingly (this assumes that
+        # the provided patterns do not contain capture groups themselves).
+        extracted = submissions.str.extract(re.compile(f"({regex.pattern})", regex.flags), expand=False)
+        missing = extracted.isna()
+        if missing.any():
+            raise ValueError(f"submission '{submissions[missing].iloc[0]}' does not contain regex pattern "
+                             f"'{regex.pattern}' for column '{name}'")
+        data[name] = extracted
     return pd.DataFrame(data)
 
 
@@ -74,43 +106,58 @@ def match_full_names(full_names: pd.Series, info_df: pd.DataFrame) -> tuple[str,
     # the info_df has, the more inefficient this heuristic becomes because of the permutations (however, we need the
     # permutations since we do not know the order of the columns in info_df). With many columns, it is this highly
     # recommended to manually provide the first name and last name columns.
-    Mismatch = namedtuple("Mismatch", ["col1", "col2", "df"])
+    ClosestMismatch = namedtuple("ClosestMismatch", ["count", "col1", "col2"])
     closest_mismatch = None
+    # The per-column string lengths are computed once up front and reused across all permutations for cheap pruning
+    # (see below), which is what keeps the permutation loop bearable for info files with many columns.
+    full_name_lengths = full_names.str.len()
+    col_lengths = {col: info_df[col].str.len() for col in info_df.columns}
     for col1, col2 in itertools.permutations(info_df.columns, 2):
-        full_names_candidates = info_df[col1] + " " + info_df[col2]
-        matching = full_names.isin(full_names_candidates)
-        if matching.all():
-            return col1, col2
-        mismatching = full_names[~matching]
-        if closest_mismatch is None or len(mismatching) < len(closest_mismatch.df):
-            closest_mismatch = Mismatch(col1, col2, mismatching)
+        # A full name can only match a candidate of exactly the same length (+1 for the joining space), so if some
+        # full name length does not occur among the candidate lengths at all, this permutation cannot match and the
+        # expensive concatenation + membership check is skipped entirely. The number of such names is a lower bound of
+        # the real mismatch count, which is good enough for reporting the closest mismatch in the error case.
+        length_mismatches = ~full_name_lengths.isin(col_lengths[col1] + col_lengths[col2] + 1)
+        if length_mismatches.any():
+            mismatch_count = length_mismatches.sum()
+        else:
+            # str.cat concatenates both columns in one vectorized pass, whereas the object-dtype "+" would call the
+            # Python-level string concatenation once per row (and allocate an intermediate Series for the separator).
+            full_names_candidates = info_df[col1].str.cat(info_df[col2], sep=" ")
+            matching = full_names.isin(full_names_candidates)
+            if matching.all():
+                return col1, col2
+            # Only track how many names mismatch here; the mismatching names themselves are materialized just once at
+            # the end for the error message instead of once per permutation.
+            mismatch_count = len(matching) - matching.sum()
+        if closest_mismatch is None or mismatch_count < closest_mismatch.count:
+            closest_mismatch = ClosestMismatch(mismatch_count, col1, col2)
+    candidates = info_df[closest_mismatch.col1].str.cat(info_df[closest_mismatch.col2], sep=" ")
     raise ValueError(f"could not identify first name and last name columns; closest mismatch for columns "
-                     f"'{closest_mismatch.col1}' and '{closest_mismatch.col2}':\n{closest_mismatch.df}")
+                     f"'{closest_mismatch.col1}' and '{closest_mismatch.col2}':\n"
+                     f"{full_names[~full_names.isin(candidates)]}")
 
 
 def weighted_chunks(df: pd.DataFrame, weights: Iterable) -> tuple[list[pd.DataFrame], int]:
     # Scale weights to sum = 1.
     weights = np.array(weights, dtype=float) / sum(weights)
-    chunk_sizes = [math.floor(len(df) * w) for w in weights]
-    # Distribute the remaining elements evenly. Just repeatedly increase each chunk size by 1 until we distributed all
-    # remaining elements.
-    remainder_size = len(df) - sum(chunk_sizes)
-    idx = 0
-    while remainder_size > 0:
-        chunk_sizes[idx] += 1
-        idx = (idx + 1) % len(chunk_sizes)
-        remainder_size -= 1
-    assert sum(chunk_sizes) == len(df)
+    chunk_sizes = np.floor(len(df) * weights).astype(int)
+    # Distribute the remaining elements evenly. Since the remainder is always smaller than the number of chunks, the
+    # former round-robin distribution simply means that the first "remainder_size" chunks each get one additional
+    # element, which is a single vectorized step.
+    remainder_size = len(df) - chunk_sizes.sum()
+    chunk_sizes[:remainder_size] += 1
+    assert chunk_sizes.sum() == len(df)
     # Remember the index of the next chunk that would have been assigned the next element (if there were any elements
     # left to distribute). This is useful for assigning new elements at a later point in time, so one can directly
     # continue at the correct index (=fair continuation of the additional element distribution).
-    next_chunk_idx = idx
-    # Chunk sizes are all set, now simply collect each chunk from "df".
-    chunks = []
-    idx = 0
-    for chunk_size in chunk_sizes:
-        chunks.append(df.iloc[idx:idx + chunk_size].copy())
-        idx += chunk_size
+    next_chunk_idx = remainder_size % len(chunk_sizes)
+    # Chunk sizes are all set, now simply collect each chunk from "df" via precomputed slice bounds. The chunks are
+    # lightweight slice views into "df"; callers that want to modify a chunk must copy it themselves (e.g., via
+    # DataFrame.assign).
+    ends = np.cumsum(chunk_sizes)
+    starts = ends - chunk_sizes
+    chunks = [df.iloc[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
     assert sum([len(c) for c in chunks]) == len(df)
     assert len(chunks) == len(weights)
     return chunks, next_chunk_idx